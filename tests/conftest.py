@@ -4,12 +4,17 @@
 import asyncio
 import asyncio.subprocess
 import contextlib
+import hashlib
+import json
 import os
 import re
-import subprocess
+import shutil
+import signal
+import sys
 import time
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Coroutine, Generator
 from pathlib import Path
+from typing import Any
 
 import httpx
 import pytest
@@ -17,11 +22,31 @@ import pytest_asyncio
 
 _DEFAULT_URL = "http://127.0.0.1:0/sovd"
 _CERT_VALIDITY_DAYS = 30
+_CERT_CACHE_MAX_AGE = _CERT_VALIDITY_DAYS * 24 * 60 * 60 / 2
 _GATEWAY_STARTUP_TIMEOUT = 15.0
 _GATEWAY_SHUTDOWN_TIMEOUT = 5.0
+_GATEWAY_LOG_QUEUE_SIZE = 1024
 _HTTP_CLIENT_TIMEOUT = 5.0
 _HTTPS_CLIENT_TIMEOUT = 10.0
-_SUBPROCESS_READ_TIMEOUT = 0.5
+_REAP_GRACE_PERIOD = 3.0
+_REAP_POLL_INTERVAL = 0.1
+_LOCK_POLL_INTERVAL = 0.1
+# Environment passed on to the gateway, Windows needs SYSTEMROOT and TEMP to start it
+_CHILD_ENV_KEYS = (
+    "PATH",
+    "HOME",
+    "USER",
+    "CARGO_HOME",
+    "RUSTUP_HOME",
+    "CARGO_TARGET_DIR",
+    "RUST_LOG",
+    "RUST_BACKTRACE",
+    "SYSTEMROOT",
+    "TEMP",
+    "TMP",
+    "TMPDIR",
+)
+_LISTEN_PATTERN = re.compile(r'protocol="(?P<protocol>[^"]+)".*listening="(?P<addr>[^"]+)".*base="(?P<base>[^"]+)"')
 
 
 def pytest_addoption(parser):
@@ -29,7 +54,7 @@ def pytest_addoption(parser):
         "--sovd-gateway-bin",
         action="store",
         default=None,
-        help="Path to sovd-gateway binary (defaults to 'cargo run --bin sovd-gateway')",
+        help="Path to sovd-gateway binary (defaults to building it with 'cargo build --bin sovd-gateway')",
     )
     parser.addoption(
         "--sovd-gateway-args",
@@ -41,41 +66,146 @@ def pytest_addoption(parser):
         "--sovd-gateway-profile",
         action="store",
         default="release",
-        help="Cargo profile to use when building with 'cargo run --profile' (default: release)",
+        help="Cargo profile to use when building with 'cargo build --profile' (default: release)",
     )
     parser.addoption(
         "--sovd-gateway-features",
         action="store",
         default="",
-        help="Comma-separated list of features to pass to 'cargo run --features'",
+        help="Comma-separated list of features to pass to 'cargo build --features'",
     )
 
 
-@pytest.fixture
-def gateway_binary(request) -> str | None:
+def _process_status(pid: int | str) -> dict[str, str]:
+    with contextlib.suppress(OSError):
+        lines = Path(f"/proc/{pid}/status").read_text().splitlines()
+        return dict(line.split(":\t", 1) for line in lines if ":\t" in line)
+    return {}
+
+
+def _find_descendants(pid: int) -> list[int]:
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return []
+
+    children: dict[int, list[int]] = {}
+    for entry in proc.iterdir():
+        if entry.name.isdigit() and (ppid := _process_status(entry.name).get("PPid")):
+            children.setdefault(int(ppid), []).append(int(entry.name))
+
+    descendants = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            descendants.append(child)
+            pending.append(child)
+    return descendants
+
+
+def _is_alive(pid: int) -> bool:
+    return _process_status(pid).get("State", "Z").strip()[:1] not in {"Z", "X"}
+
+
+def _reap(pids: list[int], grace: float = _REAP_GRACE_PERIOD) -> None:
+    for pid in pids:
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGTERM)
+
+    deadline = time.monotonic() + grace
+    while (alive := [pid for pid in pids if _is_alive(pid)]) and time.monotonic() < deadline:
+        time.sleep(_REAP_POLL_INTERVAL)
+
+    for pid in alive:
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGKILL)
+
+
+@contextlib.asynccontextmanager
+async def _file_lock(path: Path) -> AsyncGenerator[None, None]:
+    # Serializes pytest-xdist workers, the lock is released when the file is closed
+    with path.open("w") as lock_file:
+        if sys.platform == "win32":
+            import msvcrt
+
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    await asyncio.sleep(_LOCK_POLL_INTERVAL)
+        else:
+            import fcntl
+
+            await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+        yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def reap_processes() -> Generator[None, None, None]:
+    # Gateways or cargo processes leaked by a crashed fixture would otherwise
+    # outlive the session and hold the cargo target directory lock
+    yield
+    _reap(_find_descendants(os.getpid()))
+
+
+def _child_env() -> dict[str, str]:
+    return {key: os.environ[key] for key in _CHILD_ENV_KEYS if key in os.environ}
+
+
+def _cargo_build_command(profile: str, features: list[str]) -> list[str]:
+    cmd = ["cargo", "build", "--bin", "sovd-gateway", "--profile", profile]
+    if features:
+        cmd.extend(["--features", ",".join(features)])
+    # Cargo.lock is not checked in, so pinning it is opt-in
+    if os.environ.get("SOVD_CARGO_LOCKED") == "1":
+        cmd.append("--locked")
+    if os.environ.get("SOVD_CARGO_OFFLINE") == "1":
+        cmd.append("--offline")
+    return cmd
+
+
+def _cargo_target_dir(project_root: Path) -> Path:
+    return Path(os.environ.get("CARGO_TARGET_DIR", project_root / "target"))
+
+
+def _cargo_build_env(project_root: Path) -> dict[str, str]:
+    return {**os.environ, "CARGO_TARGET_DIR": str(_cargo_target_dir(project_root))}
+
+
+@pytest.fixture(scope="session")
+def prebuilt_gateway_binary(request) -> str | None:
     return request.config.getoption("--sovd-gateway-bin")
 
 
-@pytest.fixture
+@pytest_asyncio.fixture(scope="module")
+async def gateway_binary(
+    prebuilt_gateway_binary: str | None,
+    gateway_features: list[str],
+    gateway_binary_builder: Callable[[list[str]], Coroutine[Any, Any, str]],
+) -> str:
+    return prebuilt_gateway_binary or await gateway_binary_builder(gateway_features)
+
+
+@pytest.fixture(scope="module")
 def gateway_args(request) -> list[str]:
     args_str = request.config.getoption("--sovd-gateway-args")
     return args_str.split() if args_str.strip() else ["--url", _DEFAULT_URL]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def gateway_profile(request) -> str:
     return request.config.getoption("--sovd-gateway-profile")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def gateway_features(request) -> list[str]:
     features_str = request.config.getoption("--sovd-gateway-features")
     return features_str.split(",") if features_str.strip() else []
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def gateway_env() -> dict[str, str]:
-    return os.environ.copy()
+    return _child_env()
 
 
 @pytest.fixture(scope="session")
@@ -84,80 +214,153 @@ def project_root() -> Path:
 
 
 @pytest.fixture(scope="session")
-def openssl(project_root: Path, tmp_path_factory) -> dict[str, Path]:
-    temp_dir = tmp_path_factory.mktemp("sovd-certs")
+def openssl_generator(
+    request,
+    project_root: Path,
+    tmp_path_factory,
+) -> Callable[[], Coroutine[Any, Any, dict[str, Path]]]:
     mkcerts_script = project_root / "scripts" / "mkcerts.sh"
 
-    try:
-        subprocess.run(
-            [
-                str(mkcerts_script),
-                str(temp_dir),
-                str(_CERT_VALIDITY_DAYS),
-                "--no-verify",
-            ],
-            check=True,
-            capture_output=True,
-            text=True,
-            cwd=project_root,
-        )
-    except subprocess.CalledProcessError as e:
-        stderr = f", stderr: {e.stderr.strip()}" if e.stderr else ""
-        pytest.fail(f"Failed to generate certificates (exit code {e.returncode}){stderr}")
+    # Reuse certificates from earlier sessions until half their validity is used up
+    digest = hashlib.sha256(mkcerts_script.read_bytes() + str(_CERT_VALIDITY_DAYS).encode()).hexdigest()
+    cache = getattr(request.config, "cache", None)
+    # Without the cacheprovider plugin the certificates only live for this session
+    cache_root = cache.mkdir("sovd-certs") if cache is not None else tmp_path_factory.mktemp("sovd-certs")
+    cert_dir = cache_root / digest[:16]
+    staging_dir = cert_dir.with_suffix(".tmp")
+    stale_dir = cert_dir.with_suffix(".old")
+    lock_path = cert_dir.with_suffix(".lock")
 
     cert_files = {
-        "ca_cert": temp_dir / "ca-cert.pem",
-        "server_cert": temp_dir / "server-cert.pem",
-        "server_key": temp_dir / "server-key.pem",
-        "client_cert": temp_dir / "client-cert.pem",
-        "client_key": temp_dir / "client-key.pem",
+        "ca_cert": cert_dir / "ca-cert.pem",
+        "server_cert": cert_dir / "server-cert.pem",
+        "server_key": cert_dir / "server-key.pem",
+        "client_cert": cert_dir / "client-cert.pem",
+        "client_key": cert_dir / "client-key.pem",
     }
 
-    for cert_type, cert_path in cert_files.items():
-        if not cert_path.exists():
-            pytest.fail(f"Required certificate file not found: {cert_type} -> {cert_path}")
+    def is_fresh() -> bool:
+        now = time.time()
+        return all(
+            cert_path.exists() and now - cert_path.stat().st_mtime <= _CERT_CACHE_MAX_AGE
+            for cert_path in cert_files.values()
+        )
+
+    async def generate() -> dict[str, Path]:
+        # pytest-xdist workers share the cache, only one of them may regenerate at a time
+        async with _file_lock(lock_path):
+            if not is_fresh():
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                mkcerts_process = await asyncio.create_subprocess_exec(
+                    str(mkcerts_script),
+                    str(staging_dir),
+                    str(_CERT_VALIDITY_DAYS),
+                    "--no-verify",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=project_root,
+                )
+                _, stderr = await mkcerts_process.communicate()
+
+                if mkcerts_process.returncode != 0:
+                    error_msg = f", stderr: {stderr.decode('utf-8', errors='replace').strip()}" if stderr else ""
+                    pytest.fail(f"Failed to generate certificates (exit code {mkcerts_process.returncode}){error_msg}")
+
+                # Swap whole directories so an interrupted refresh never leaves a partial cache behind
+                shutil.rmtree(stale_dir, ignore_errors=True)
+                if cert_dir.exists():
+                    cert_dir.rename(stale_dir)
+                staging_dir.rename(cert_dir)
+                shutil.rmtree(stale_dir, ignore_errors=True)
+
+        for cert_type, cert_path in cert_files.items():
+            if not cert_path.exists():
+                pytest.fail(f"Required certificate file not found: {cert_type} -> {cert_path}")
 
-    return cert_files
+        return cert_files
+
+    return generate
+
+
+@pytest_asyncio.fixture(scope="session")
+async def openssl(openssl_generator: Callable[[], Coroutine[Any, Any, dict[str, Path]]]) -> dict[str, Path]:
+    return await openssl_generator()
+
+
+@pytest.fixture(scope="session")
+def gateway_binary_builder(
+    project_root: Path,
+    gateway_profile: str,
+    tmp_path_factory,
+) -> Callable[[list[str]], Coroutine[Any, Any, str]]:
+    binaries: dict[tuple[str, ...], str] = {}
+
+    async def build(features: list[str]) -> str:
+        key = tuple(sorted(features))
+        if key in binaries:
+            return binaries[key]
+
+        target_dir = _cargo_target_dir(project_root)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        # Workers building other feature sets write the same target path, hold the lock until the copy is done
+        async with _file_lock(target_dir / "sovd-gateway-tests.lock"):
+            build_process = await asyncio.create_subprocess_exec(
+                *_cargo_build_command(gateway_profile, list(key)),
+                "--message-format=json",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=project_root,
+                env=_cargo_build_env(project_root),
+            )
+            stdout, stderr = await build_process.communicate()
+
+            if build_process.returncode != 0:
+                error_msg = f", stderr: {stderr.decode('utf-8', errors='replace').strip()}" if stderr else ""
+                pytest.fail(f"Cargo build failed (exit code {build_process.returncode}){error_msg}")
+
+            executable = None
+            for line in stdout.decode("utf-8", errors="replace").splitlines():
+                message = json.loads(line)
+                if message.get("reason") == "compiler-artifact" and message["target"]["name"] == "sovd-gateway":
+                    executable = message.get("executable") or executable
+
+            if executable is None:
+                pytest.fail("Cargo build did not report a sovd-gateway executable")
+
+            # Feature sets share one target path, keep a private copy per set
+            binary_dir = tmp_path_factory.mktemp("sovd-gateway")
+            binaries[key] = shutil.copy2(executable, binary_dir)
+        return binaries[key]
+
+    return build
 
 
 class GatewayManager:
-    def __init__(
-        self,
-        binary_path: str | None,
-        project_root: Path,
-        profile: str = "release",
-        features: list[str] | None = None,
-    ):
+    def __init__(self, binary_path: str, project_root: Path):
         self.binary_path = binary_path
         self.project_root = project_root
-        self.profile = profile
-        self.features = features or []
         self.process: asyncio.subprocess.Process | None = None
         self.base_url: str | None = None
+        self._log_lines: asyncio.Queue[bytes] | None = None
+        self._log_task: asyncio.Task[None] | None = None
 
     async def start(self, args: list[str] | None = None, env: dict[str, str] | None = None) -> str:
-        cmd_args = args or []
-        process_env = env or os.environ.copy()
-
-        if self.binary_path:
-            cmd = [self.binary_path, *cmd_args]
-        else:
-            await self._build_binary(process_env)
-
-            cmd = ["cargo", "run", "--bin", "sovd-gateway", "--profile", self.profile]
-            if self.features:
-                cmd.extend(["--features", ",".join(self.features)])
-            cmd.extend(["--", *cmd_args])
-
         self.process = await asyncio.create_subprocess_exec(
-            *cmd,
+            self.binary_path,
+            *(args or []),
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.STDOUT,
             cwd=self.project_root,
-            env=process_env,
+            env=_child_env() if env is None else env,
         )
+        self._log_lines = asyncio.Queue(maxsize=_GATEWAY_LOG_QUEUE_SIZE)
+        self._log_task = asyncio.create_task(self._drain_stdout())
 
-        self.base_url = await self._wait_for_ready()
+        try:
+            self.base_url = await self._wait_for_ready()
+        except RuntimeError:
+            await self.stop()
+            raise
         return self.base_url
 
     async def stop(self, timeout: float = _GATEWAY_SHUTDOWN_TIMEOUT) -> None:
@@ -165,15 +368,22 @@ class GatewayManager:
             return
 
         try:
-            self.process.terminate()
+            with contextlib.suppress(ProcessLookupError):
+                self.process.terminate()
             try:
                 await asyncio.wait_for(self.process.wait(), timeout=timeout)
             except TimeoutError:
                 self.process.kill()
                 await self.process.wait()
         finally:
+            if self._log_task is not None:
+                self._log_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await self._log_task
             self.process = None
             self.base_url = None
+            self._log_lines = None
+            self._log_task = None
 
     def __del__(self):
         if self.process and self.is_running():
@@ -192,100 +402,77 @@ class GatewayManager:
     def get_pid(self) -> int | None:
         return self.process.pid if self.process else None
 
-    async def _build_binary(self, env: dict[str, str]) -> None:
-        build_cmd = ["cargo", "build", "--bin", "sovd-gateway", "--profile", self.profile]
-        if self.features:
-            build_cmd.extend(["--features", ",".join(self.features)])
-
-        build_process = await asyncio.create_subprocess_exec(
-            *build_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=self.project_root,
-            env=env,
-        )
-
-        _, stderr = await build_process.communicate()
-
-        if build_process.returncode != 0:
-            error_msg = stderr.decode("utf-8", errors="replace") if stderr else "Unknown error"
-            msg = f"Cargo build failed with exit code {build_process.returncode}: {error_msg}"
+    async def _drain_stdout(self) -> None:
+        if self.process is None or self.process.stdout is None or self._log_lines is None:
+            msg = "Process stdout not available"
             raise RuntimeError(msg)
 
+        # Keep the pipe empty so a chatty gateway never blocks on write; once
+        # the queue is full the oldest lines are dropped. b"" marks EOF.
+        while True:
+            line_bytes = await self.process.stdout.readline()
+            if self._log_lines.full():
+                self._log_lines.get_nowait()
+            self._log_lines.put_nowait(line_bytes)
+            if not line_bytes:
+                return
+
     async def _wait_for_ready(self, timeout: float = _GATEWAY_STARTUP_TIMEOUT) -> str:
-        if self.process is None:
+        if self.process is None or self._log_lines is None:
             msg = "Process not started"
             raise RuntimeError(msg)
 
-        start_time = time.time()
-        listen_pattern = re.compile(
-            r'protocol="(?P<protocol>[^"]+)".*listening="(?P<addr>[^"]+)".*base="(?P<base>[^"]+)"'
-        )
-
-        while time.time() - start_time < timeout:
-            if self.process.returncode is not None:
-                msg = f"Gateway process exited with code {self.process.returncode}"
-                raise RuntimeError(msg)
-
-            if self.process.stdout is None:
-                msg = "Process stdout not available"
-                raise RuntimeError(msg)
+        deadline = time.monotonic() + timeout
 
+        while (remaining := deadline - time.monotonic()) > 0:
             try:
-                line_bytes = await asyncio.wait_for(
-                    self.process.stdout.readline(),
-                    timeout=_SUBPROCESS_READ_TIMEOUT,
-                )
-
-                if not line_bytes:
-                    if self.process.returncode is not None:
-                        msg = "Process exited unexpectedly"
-                        raise RuntimeError(msg)
-                    continue
+                line_bytes = await asyncio.wait_for(self._log_lines.get(), timeout=remaining)
+            except TimeoutError:
+                break
 
-                line = line_bytes.decode("utf-8", errors="replace").rstrip()
+            if not line_bytes:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self.process.wait(), timeout=remaining)
+                msg = f"Gateway process exited with code {self.process.returncode}"
+                raise RuntimeError(msg)
 
-                if match := listen_pattern.search(line):
-                    return f"{match['protocol']}://{match['addr']}{match['base']}"
+            line = line_bytes.decode("utf-8", errors="replace").rstrip()
 
-            except (TimeoutError, OSError):
-                continue
+            if match := _LISTEN_PATTERN.search(line):
+                return f"{match['protocol']}://{match['addr']}{match['base']}"
 
         msg = f"Gateway failed to start within {timeout} seconds"
         raise RuntimeError(msg)
 
 
 @pytest_asyncio.fixture
-async def gateway_manager(
-    gateway_binary: str | None,
-    project_root: Path,
-    gateway_profile: str,
-    gateway_features: list[str],
-) -> AsyncGenerator[GatewayManager, None]:
-    manager = GatewayManager(gateway_binary, project_root, gateway_profile, gateway_features)
+async def gateway_manager(gateway_binary: str, project_root: Path) -> AsyncGenerator[GatewayManager, None]:
+    manager = GatewayManager(gateway_binary, project_root)
     yield manager
 
     if manager.is_running():
         await manager.stop()
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(scope="module")
 async def gateway(
-    gateway_manager: GatewayManager,
+    gateway_binary: str,
+    project_root: Path,
     gateway_args: list[str],
     gateway_env: dict[str, str],
 ) -> AsyncGenerator[GatewayManager, None]:
-    await gateway_manager.start(args=gateway_args, env=gateway_env)
-    yield gateway_manager
-    await gateway_manager.stop()
+    manager = GatewayManager(gateway_binary, project_root)
+    await manager.start(args=gateway_args, env=gateway_env)
+    yield manager
+    await manager.stop()
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(scope="module")
 async def gateway_url(gateway) -> str:
     return gateway.base_url
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(scope="module")
 async def client(gateway_url: str) -> AsyncGenerator[httpx.AsyncClient, None]:
     async with httpx.AsyncClient(base_url=gateway_url, timeout=_HTTP_CLIENT_TIMEOUT) as client:
         yield client
@@ -1,17 +1,21 @@
 # SPDX-FileCopyrightText: Copyright Liebherr-Digital Development Center GmbH
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import ssl
 import sys
+from collections.abc import Callable, Coroutine
 from pathlib import Path
+from typing import Any
 
 import httpx
 import pytest
+import pytest_asyncio
 
 _HTTPS_CLIENT_TIMEOUT = 10.0
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def gateway_args(openssl: dict[str, Path]):
     return [
         "--url",
@@ -25,11 +29,36 @@ def gateway_args(openssl: dict[str, Path]):
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def gateway_features():
     return ["openssl"]
 
 
+@pytest_asyncio.fixture(scope="module")
+async def gateway_prerequisites(
+    prebuilt_gateway_binary: str | None,
+    gateway_features: list[str],
+    gateway_binary_builder: Callable[[list[str]], Coroutine[Any, Any, str]],
+    openssl_generator: Callable[[], Coroutine[Any, Any, dict[str, Path]]],
+) -> tuple[str, dict[str, Path]]:
+    # Generate the certificates while cargo builds instead of one after the other
+    async with asyncio.TaskGroup() as tg:
+        certs = tg.create_task(openssl_generator())
+        if not prebuilt_gateway_binary:
+            build = tg.create_task(gateway_binary_builder(gateway_features))
+    return prebuilt_gateway_binary or build.result(), certs.result()
+
+
+@pytest.fixture(scope="module")
+def gateway_binary(gateway_prerequisites: tuple[str, dict[str, Path]]) -> str:
+    return gateway_prerequisites[0]
+
+
+@pytest.fixture(scope="module")
+def openssl(gateway_prerequisites: tuple[str, dict[str, Path]]) -> dict[str, Path]:
+    return gateway_prerequisites[1]
+
+
 @pytest.mark.skipif(sys.platform in {"darwin", "win32"}, reason="Not applicable on macOS and Windows")
 async def test_start_stop_mtls(gateway, openssl):
     assert gateway.is_running()
@@ -1,8 +1,11 @@
 # SPDX-FileCopyrightText: Copyright Liebherr-Digital Development Center GmbH
 # SPDX-License-Identifier: Apache-2.0
 
+import functools
 import time
+from collections.abc import Mapping
 from pathlib import Path
+from types import MappingProxyType
 from typing import Any
 
 import jwt
@@ -10,58 +13,86 @@ import pytest
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 
-_RSA_KEY_SIZE = 2048
-_RSA_PUBLIC_EXPONENT = 65537
+# Static key pair for signing test tokens only, never use it anywhere else
+_PRIVATE_KEY_PATH = Path(__file__).parent / "fixtures" / "test_rsa_2048.pem"
+_PUBLIC_KEY_PATH = Path(__file__).parent / "fixtures" / "test_rsa_2048.pub.pem"
+# The gateway only accepts RSA public keys and verifies RS256 signatures
+_JWT_ALGORITHM = "RS256"
 _TOKEN_EXPIRY_SECONDS = 3600
+_TOKEN_TIME_BUCKET_SECONDS = 60
+_TOKEN_CACHE_SIZE = 32
 _TOKEN_EXPIRED_SECONDS_AGO = 3600
 _TOKEN_ISSUED_SECONDS_AGO = 7200
 
-_DEFAULT_JWT_PAYLOAD: dict[str, Any] = {
-    "sub": "test-user",
-    "aud": "sovd",
-    "iss": "sovd-test",
-}
+_DEFAULT_JWT_PAYLOAD: Mapping[str, Any] = MappingProxyType(
+    {
+        "sub": "test-user",
+        "aud": "sovd",
+        "iss": "sovd-test",
+    }
+)
+_DEFAULT_JWT_PAYLOAD_ITEMS: tuple[tuple[str, Any], ...] = tuple(_DEFAULT_JWT_PAYLOAD.items())
 
 
 class JWTHelper:
-    def __init__(self, private_pem: bytes, public_pem_path: Path):
-        self.private_pem = private_pem
+    def __init__(self, private_key: rsa.RSAPrivateKey, public_pem_path: Path):
+        self.private_key = private_key
         self.public_pem_path = public_pem_path
+        self._sign = functools.lru_cache(maxsize=_TOKEN_CACHE_SIZE)(self._encode)
 
     def create_jwt(self, payload: dict[str, Any] | None = None) -> str:
-        now = int(time.time())
-        jwt_payload = _DEFAULT_JWT_PAYLOAD | {"exp": now + _TOKEN_EXPIRY_SECONDS, "iat": now} | (payload or {})
-        return jwt.encode(jwt_payload, self.private_pem, algorithm="RS256")
+        # Round the issue time down so identical claims within a minute reuse one signature
+        now = int(time.time()) // _TOKEN_TIME_BUCKET_SECONDS * _TOKEN_TIME_BUCKET_SECONDS
+        jwt_payload = dict(_DEFAULT_JWT_PAYLOAD_ITEMS)
+        jwt_payload["exp"] = now + _TOKEN_EXPIRY_SECONDS
+        jwt_payload["iat"] = now
+        if payload:
+            jwt_payload.update(payload)
+        claims = tuple(sorted(jwt_payload.items()))
+        try:
+            hash(claims)
+        except TypeError:
+            return self._encode(claims)
+        return self._sign(claims)
+
+    def _encode(self, claims: tuple[tuple[str, Any], ...]) -> str:
+        return jwt.encode(dict(claims), self.private_key, algorithm=_JWT_ALGORITHM)
+
+
+def _authorization_headers(request: pytest.FixtureRequest, auth: str | None) -> dict[str, str]:
+    # Only the scenarios that sign a token pull in the jwt_keys fixture
+    match auth:
+        case None:
+            return {}
+        case "valid":
+            token = request.getfixturevalue("jwt_keys").create_jwt()
+        case "invalid":
+            return {"Authorization": "Bearer invalid.token.here"}
+        case "expired":
+            now = int(time.time())
+            expired_payload = {
+                "exp": now - _TOKEN_EXPIRED_SECONDS_AGO,
+                "iat": now - _TOKEN_ISSUED_SECONDS_AGO,
+            }
+            token = request.getfixturevalue("jwt_keys").create_jwt(payload=expired_payload)
+        case _:
+            msg = f"Unknown auth scenario: {auth}"
+            raise ValueError(msg)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def jwt_keys() -> JWTHelper:
+    private_key = serialization.load_pem_private_key(_PRIVATE_KEY_PATH.read_bytes(), password=None)
+    if not isinstance(private_key, rsa.RSAPrivateKey):
+        pytest.fail(f"Test key is not an RSA private key: {_PRIVATE_KEY_PATH}")
+
+    return JWTHelper(private_key, _PUBLIC_KEY_PATH)
 
 
 @pytest.fixture(scope="module")
-def jwt_keys(tmp_path_factory) -> JWTHelper:
-    tmp_dir = tmp_path_factory.mktemp("jwt_keys")
-
-    private_key = rsa.generate_private_key(
-        public_exponent=_RSA_PUBLIC_EXPONENT,
-        key_size=_RSA_KEY_SIZE,
-    )
-    public_key = private_key.public_key()
-
-    public_pem_path = tmp_dir / "public_key.pem"
-    public_pem = public_key.public_bytes(
-        encoding=serialization.Encoding.PEM, format=serialization.PublicFormat.SubjectPublicKeyInfo
-    )
-    public_pem_path.write_bytes(public_pem)
-
-    private_pem = private_key.private_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.PKCS8,
-        encryption_algorithm=serialization.NoEncryption(),
-    )
-
-    return JWTHelper(private_pem, public_pem_path)
-
-
-@pytest.fixture
-def gateway_args(jwt_keys) -> list[str]:
-    return ["--url", "http://127.0.0.1:0/sovd", "--auth-jwt", str(jwt_keys.public_pem_path)]
+def gateway_args() -> list[str]:
+    return ["--url", "http://127.0.0.1:0/sovd", "--auth-jwt", str(_PUBLIC_KEY_PATH)]
 
 
 async def test_unprotected_endpoint_without_token(client):
@@ -70,33 +101,14 @@ async def test_unprotected_endpoint_without_token(client):
     assert "sovd_info" in response.json()
 
 
-async def test_protected_endpoint_without_token(client):
-    response = await client.get("/v1/components")
-    assert response.status_code == 401
-
+@pytest.mark.parametrize(
+    ("auth", "expected_status"),
+    [(None, 401), ("valid", 200), ("invalid", 401), ("expired", 401)],
+    ids=["without_token", "with_valid_token", "with_invalid_token", "with_expired_token"],
+)
+async def test_protected_endpoint(client, request, auth, expected_status):
+    response = await client.get("/v1/components", headers=_authorization_headers(request, auth))
+    assert response.status_code == expected_status
 
-async def test_protected_endpoint_with_valid_token(client, jwt_keys):
-    token = jwt_keys.create_jwt()
-    headers = {"Authorization": f"Bearer {token}"}
-    response = await client.get("/v1/components", headers=headers)
-
-    assert response.status_code == 200
-    assert response.headers.get("content-type") == "application/json"
-
-
-async def test_protected_endpoint_with_invalid_token(client):
-    headers = {"Authorization": "Bearer invalid.token.here"}
-    response = await client.get("/v1/components", headers=headers)
-    assert response.status_code == 401
-
-
-async def test_protected_endpoint_with_expired_token(client, jwt_keys):
-    now = int(time.time())
-    expired_payload = {
-        "exp": now - _TOKEN_EXPIRED_SECONDS_AGO,
-        "iat": now - _TOKEN_ISSUED_SECONDS_AGO,
-    }
-    token = jwt_keys.create_jwt(payload=expired_payload)
-    headers = {"Authorization": f"Bearer {token}"}
-    response = await client.get("/v1/components", headers=headers)
-    assert response.status_code == 401
+    if expected_status == 200:
+        assert response.headers.get("content-type") == "application/json"
@@ -5,23 +5,38 @@ from collections.abc import AsyncGenerator
 
 import pytest
 import pytest_asyncio
-from playwright.async_api import Page, async_playwright
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
 
 pytestmark = pytest.mark.asyncio
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def gateway_features() -> list[str]:
     return ["ui"]
 
 
-@pytest_asyncio.fixture
-async def page() -> AsyncGenerator[Page, None]:
+@pytest_asyncio.fixture(scope="session")
+async def browser() -> AsyncGenerator[Browser, None]:
     async with async_playwright() as p:
         browser = await p.chromium.launch(args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-web-security"])
-        context = await browser.new_context(ignore_https_errors=True)
-        page = await context.new_page()
-        yield page
+        yield browser
+        await browser.close()
+
+
+@pytest_asyncio.fixture(scope="module")
+async def context(browser: Browser) -> AsyncGenerator[BrowserContext, None]:
+    context = await browser.new_context(viewport={"width": 1280, "height": 720}, ignore_https_errors=True)
+    yield context
+    await context.close()
+
+
+@pytest_asyncio.fixture
+async def page(context: BrowserContext) -> AsyncGenerator[Page, None]:
+    page = await context.new_page()
+    yield page
+    await page.close()
+    # Tests share the context, so drop the cookies one test may leave behind for the next
+    await context.clear_cookies()
 
 
 @pytest_asyncio.fixture
@@ -1,12 +1,29 @@
 # SPDX-FileCopyrightText: Copyright Liebherr-Digital Development Center GmbH
 # SPDX-License-Identifier: Apache-2.0
 
+import contextlib
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from playwright.async_api import expect
 
+_LAYOUT_SELECTORS = ["#app", ".topbar", ".sidebar", ".main-panel"]
+# Same notion of visible as expect().to_be_visible(): a non-empty box and not visibility:hidden
+_HIDDEN_SELECTORS = """selectors => selectors.filter(selector => {
+    const element = document.querySelector(selector);
+    if (!element) return true;
+    const rect = element.getBoundingClientRect();
+    return rect.width === 0 || rect.height === 0 || getComputedStyle(element).visibility === "hidden";
+})"""
+_EXPECT_TIMEOUT_MS = 5000
+
 
 async def test_page_loads(ui):
     await expect(ui).to_have_title("SOVD")
-    await expect(ui.locator("#app")).to_be_visible()
-    await expect(ui.locator(".topbar")).to_be_visible()
-    await expect(ui.locator(".sidebar")).to_be_visible()
-    await expect(ui.locator(".main-panel")).to_be_visible()
+    # Poll all layout regions in the browser instead of one expect round trip per selector
+    with contextlib.suppress(PlaywrightTimeoutError):
+        await ui.wait_for_function(
+            f"selectors => ({_HIDDEN_SELECTORS})(selectors).length === 0",
+            arg=_LAYOUT_SELECTORS,
+            timeout=_EXPECT_TIMEOUT_MS,
+        )
+    assert await ui.evaluate(_HIDDEN_SELECTORS, _LAYOUT_SELECTORS) == []